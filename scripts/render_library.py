@@ -0,0 +1,120 @@
+"""
+Render many LDraw parts in parallel, one persistent Blender per worker.
+
+Usage:
+    python3 render_library.py <output_dir> <part.dat>... [--workers N] [--blender PATH] [--timeout S]
+        [--ldraw-path PATH] [--thickness T] [--fill-color C] [--fill-opacity O] [--stroke-color C]
+
+Each worker owns one render_part.py server process (see render_server.py)
+pinned to a single render thread. Workers pull the next part from a shared
+queue as they finish, so a few slow parts don't leave cores idle. A part
+that takes longer than the timeout (120 s by default, as in the HTTP service)
+is killed and recorded as a failure. If a worker's Blender dies, the worker
+starts a new one for its next part. Output files are named after the part,
+e.g. 3001.dat -> <output_dir>/3001.svg, so parts with the same name from
+different folders are rejected before anything is rendered.
+"""
+
+import argparse
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from render_server import RenderServer
+
+
+def output_name(part):
+    """Return the SVG filename a part renders to, e.g. parts/3001.dat -> 3001.svg."""
+    return os.path.normcase(os.path.splitext(os.path.basename(part))[0] + ".svg")
+
+
+def render_library(parts, output_dir, workers=None, blender="blender", options=None, timeout=120):
+    """Render every part into output_dir; returns a list of (part, error) failures.
+
+    Raises ValueError, before rendering anything, if two parts would write the
+    same output file (e.g. parts/3001.dat and unofficial/parts/3001.dat).
+    """
+    outputs = {}
+    for part in parts:
+        outputs.setdefault(output_name(part), []).append(part)
+    clashes = [names for names in outputs.values() if len(names) > 1]
+    if clashes:
+        raise ValueError("parts would overwrite each other's output: " +
+                         "; ".join(", ".join(names) for names in clashes))
+
+    os.makedirs(output_dir, exist_ok=True)
+    local = threading.local()
+    servers = []
+    servers_lock = threading.Lock()
+
+    def render(part):
+        job = dict(options or {},
+                   input_file=part,
+                   output_svg=os.path.join(output_dir, output_name(part)),
+                   threads=1)
+
+        server = getattr(local, "server", None)
+        try:
+            if server is None:
+                server = local.server = RenderServer(blender)
+                with servers_lock:
+                    servers.append(server)
+            server.render(job, timeout=timeout)
+            return part, None
+        except OSError as e:
+            # Blender couldn't be started or its pipe broke, so replace it
+            if server is not None:
+                server.process.kill()
+            local.server = None
+            return part, str(e)
+        except RuntimeError as e:
+            # Start a fresh Blender for this worker's next part if this one
+            # died or timed out
+            if server.process.poll() is not None:
+                local.server = None
+            return part, str(e)
+
+    # Workers only wait on their Blender's pipe, so threads are enough here
+    failures = []
+    try:
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            for part, error in pool.map(render, parts):
+                if error:
+                    print(f"FAILED {part}: {error}")
+                    failures.append((part, error))
+                else:
+                    print(f"Rendered {part}")
+    finally:
+        for server in servers:
+            server.close()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render LDraw parts to SVG in parallel.")
+    parser.add_argument("output_dir")
+    parser.add_argument("parts", nargs="+", metavar="part.dat")
+    parser.add_argument("--workers", type=int, help="parallel Blender processes (default: CPU count)")
+    parser.add_argument("--blender", default="blender", help="Blender executable")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds allowed per part (default: 120)")
+    parser.add_argument("--ldraw-path")
+    parser.add_argument("--thickness", type=float)
+    parser.add_argument("--fill-color")
+    parser.add_argument("--fill-opacity", type=float)
+    parser.add_argument("--stroke-color")
+    args = parser.parse_args()
+
+    job_options = ("ldraw_path", "thickness", "fill_color", "fill_opacity", "stroke_color")
+    options = {name: getattr(args, name) for name in job_options if getattr(args, name) is not None}
+
+    try:
+        failures = render_library(args.parts, args.output_dir, args.workers, args.blender, options, args.timeout)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"{len(args.parts) - len(failures)} rendered, {len(failures)} failed")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
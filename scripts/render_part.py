@@ -4,7 +4,7 @@ Render an LDraw part as an SVG line drawing using Blender Freestyle.
 Usage:
     blender --background --python render_part.py -- <input.dat> <output.svg> [ldraw_path] [thickness] \
         [fill_color] [camera_lat] [camera_lon] [res_x] [res_y] [padding] [crease_angle] [edge_types] \
-        [fill_opacity] [stroke_color]
+        [fill_opacity] [stroke_color] [threads]
 
 Arguments:
     input.dat      Path to the LDraw .dat part file
@@ -21,17 +21,62 @@ Arguments:
     edge_types     Comma-separated edge types (default: silhouette,crease,border)
     fill_opacity   Fill opacity 0.0-1.0 (default: 1.0); <1.0 enables hidden edge rendering
     stroke_color   Stroke color for lines (default: currentColor)
+    threads        Render threads, 0 to use all cores (default: 0)
+
+Server mode:
+    blender --background --python render_part.py -- --server
+
+    Keeps Blender and its addons loaded and renders one job per JSON line read
+    from stdin, e.g. {"input_file": "3001.dat", "output_svg": "3001.svg", "thickness": 3.0}.
+    Keys are the argument names used by parse_args(); omitted keys take the
+    defaults above. Each job is answered with one JSON line on stdout:
+    {"ok": true} or {"ok": false, "error": "..."}. See render_server.py.
 """
 
 import bpy
+import bmesh
 import addon_utils
 import sys
 import os
 import re
+import hashlib
+import importlib
+import json
 import mathutils
-import xml.etree.ElementTree as ET
+import numpy as np
 from math import radians, atan, sqrt
 
+# When set, joined part meshes are cached here so repeat renders skip
+# ImportLDraw entirely. Unset (the default) keeps every render stateless.
+CACHE_DIR = os.environ.get("RENDER_CACHE_DIR") or None
+
+# Library folders ImportLDraw searches for subfiles, with unofficial parts enabled
+LIBRARY_DIRS = ("parts", "p", "models", os.path.join("unofficial", "parts"), os.path.join("unofficial", "p"))
+
+# Library folders of primitives and subparts, the files many parts share
+SHARED_LIBRARY_DIRS = ("p", os.path.join("parts", "s"),
+                       os.path.join("unofficial", "p"), os.path.join("unofficial", "parts", "s"))
+
+
+# Positional arguments after "--", in order, as (name, type, default)
+ARGUMENTS = [
+    ("input_file", str, None),
+    ("output_svg", str, None),
+    ("ldraw_path", str, "/usr/share/ldraw/ldraw"),
+    ("thickness", float, 2.0),
+    ("fill_color", str, "currentColor"),
+    ("camera_lat", float, 30.0),
+    ("camera_lon", float, 45.0),
+    ("resolution_x", int, 1024),
+    ("resolution_y", int, 1024),
+    ("padding", float, 0.03),
+    ("crease_angle", float, 135.0),
+    ("edge_types", str, "silhouette,crease,border"),
+    ("fill_opacity", float, 1.0),
+    ("stroke_color", str, "currentColor"),
+    ("threads", int, 0),
+]
+
 
 def parse_args():
     argv = sys.argv
@@ -45,39 +90,122 @@ def parse_args():
         sys.exit(1)
 
     return {
-        "input_file": argv[0],
-        "output_svg": argv[1],
-        "ldraw_path": argv[2] if len(argv) > 2 else "/usr/share/ldraw/ldraw",
-        "thickness": float(argv[3]) if len(argv) > 3 else 2.0,
-        "fill_color": argv[4] if len(argv) > 4 else "currentColor",
-        "camera_lat": float(argv[5]) if len(argv) > 5 else 30.0,
-        "camera_lon": float(argv[6]) if len(argv) > 6 else 45.0,
-        "resolution_x": int(argv[7]) if len(argv) > 7 else 1024,
-        "resolution_y": int(argv[8]) if len(argv) > 8 else 1024,
-        "padding": float(argv[9]) if len(argv) > 9 else 0.03,
-        "crease_angle": float(argv[10]) if len(argv) > 10 else 135.0,
-        "edge_types": argv[11] if len(argv) > 11 else "silhouette,crease,border",
-        "fill_opacity": float(argv[12]) if len(argv) > 12 else 1.0,
-        "stroke_color": argv[13] if len(argv) > 13 else "currentColor",
+        name: convert(argv[i]) if len(argv) > i else default
+        for i, (name, convert, default) in enumerate(ARGUMENTS)
+    }
+
+
+def job_args(job):
+    """Build render arguments from a server-mode JSON job, applying CLI defaults."""
+    missing = [name for name in ("input_file", "output_svg") if name not in job]
+    if missing:
+        raise ValueError(f"job is missing {', '.join(missing)}")
+
+    return {
+        name: convert(job[name]) if name in job else default
+        for name, convert, default in ARGUMENTS
     }
 
 
+def enable_addons():
+    """Enable the LDraw importer and the Freestyle SVG exporter."""
+    addon_utils.enable("ImportLDraw")
+    addon_utils.enable("render_freestyle_svg", default_set=True, persistent=True)
+
+
 def clear_scene():
     """Remove all objects from the scene."""
-    bpy.ops.object.select_all(action='SELECT')
-    bpy.ops.object.delete()
+    # Removing through bpy.data skips the selection and delete operators
+    for obj in list(bpy.data.objects):
+        bpy.data.objects.remove(obj, do_unlink=True)
+
+    # Also remove the data the deleted objects leave behind (meshes, materials,
+    # cameras, and the collections, images and node groups imports create) in
+    # one recursive sweep, so a long-running server doesn't accumulate them
+    bpy.ops.outliner.orphans_purge(do_local_ids=True, do_linked_ids=True, do_recursive=True)
+
+
+# ImportLDraw's parsed-file caches, kept across imports by a server: their
+# original clearCache functions, the library the entries came from, and the
+# (mtime, size) each kept file had when it was first kept
+_parse_caches = {"clear": [], "ldraw_path": None, "stamps": {}}
 
-    # Also remove orphan data
-    for mesh in bpy.data.meshes:
-        bpy.data.meshes.remove(mesh)
-    for mat in bpy.data.materials:
-        bpy.data.materials.remove(mat)
-    for cam in bpy.data.cameras:
-        bpy.data.cameras.remove(cam)
+
+def _library_file_stamp(path, roots):
+    """Return (mtime, size) for a path under one of roots, or None for anything else."""
+    if not isinstance(path, str) or not os.path.realpath(path).startswith(roots):
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _prune_parse_cache(cache):
+    """Drop the entries of an ImportLDraw cache that a later import can't safely reuse.
+
+    Only primitives and subparts are kept, since those are what other parts
+    reuse, and only while they are unchanged on disk. Top-level parts (which
+    the server and render_library.py load from the library's parts folder) are
+    each imported once, so keeping them would grow memory with every job.
+    Directory listings are kept for any folder inside the library.
+    """
+    library_root = os.path.realpath(_parse_caches["ldraw_path"])
+    library_roots = (os.path.join(library_root, ""),)
+    shared_roots = tuple(os.path.join(library_root, d, "") for d in SHARED_LIBRARY_DIRS)
+    stamps = _parse_caches["stamps"]
+    for name, entries in list(vars(cache).items()):
+        if name.startswith("__") or not isinstance(entries, dict):
+            continue
+        kept = {}
+        for key, value in entries.items():
+            # Parsed files know where they were read from; directory listings
+            # are keyed by their directory
+            if hasattr(value, "fullFilepath"):
+                path, roots = value.fullFilepath, shared_roots
+            else:
+                path, roots = key, library_roots
+            stamp = _library_file_stamp(path, roots)
+            if stamp is not None and stamps.setdefault(path, stamp) == stamp:
+                kept[key] = value
+            elif stamp is not None:
+                stamps[path] = stamp
+        setattr(cache, name, kept)
+
+
+def keep_ldraw_parse_caches():
+    """Let ImportLDraw's later imports reuse library files parsed by earlier ones.
+
+    Most parts share the same primitives (studs, cylinders, edges) and
+    subparts, which ImportLDraw caches by filename within one import and then
+    throws away. A server renders many parts with the same library, so at the
+    start of each import it keeps the parsed primitives and subparts, plus the
+    library's directory listings, and drops the rest. The geometry and material caches still clear
+    on every import, since they hold datablocks that are purged between jobs.
+    """
+    try:
+        loadldraw = importlib.import_module("ImportLDraw.loadldraw.loadldraw")
+    except ImportError:
+        print("Warning: ImportLDraw internals not found, parse caches not kept")
+        return
+
+    for name in ("CachedDirectoryFilenames", "CachedFiles"):
+        cache = getattr(loadldraw, name, None)
+        if cache is not None and hasattr(cache, "clearCache"):
+            _parse_caches["clear"].append(cache.clearCache)
+            cache.clearCache = staticmethod(lambda cache=cache: _prune_parse_cache(cache))
 
 
 def import_ldraw_part(filepath, ldraw_path):
     """Import an LDraw part using the ImportLDraw addon."""
+    # Kept parse caches are only valid for the library they were read from
+    if _parse_caches["ldraw_path"] != ldraw_path:
+        for clear in _parse_caches["clear"]:
+            clear()
+        _parse_caches["ldraw_path"] = ldraw_path
+        _parse_caches["stamps"] = {}
+
     bpy.ops.import_scene.importldraw(
         filepath=filepath,
         ldrawPath=ldraw_path,
@@ -99,8 +227,177 @@ def import_ldraw_part(filepath, ldraw_path):
     )
 
 
-def setup_camera(scene, padding=0.03, camera_lat=30.0, camera_lon=45.0):
-    """Create an orthographic camera at a given angle, framed to fit all objects."""
+def join_part_meshes(scene):
+    """Realize instances, join all meshes into one object, and fix up normals.
+
+    Required for Freestyle to detect edges on all ImportLDraw-imported parts.
+    """
+    # Each operator call costs a full depsgraph update, so skip the ones that
+    # would be no-ops: most simple parts import as one mesh with no instancers.
+    if any(o.instance_type != 'NONE' for o in scene.objects):
+        bpy.ops.object.select_all(action='SELECT')
+        bpy.ops.object.duplicates_make_real()
+    # Leftover selected empties are harmless: join only merges meshes
+    meshes = [o for o in scene.objects if o.type == 'MESH']
+    for o in meshes:
+        o.select_set(True)
+    if meshes:
+        bpy.context.view_layer.objects.active = meshes[0]
+        if len(meshes) > 1:
+            bpy.ops.object.join()
+        # Same bmesh operator normals_make_consistent runs, applied in object
+        # mode to skip both edit-mode switches
+        mesh = meshes[0].data
+        bm = bmesh.new()
+        bm.from_mesh(mesh)
+        bmesh.ops.recalc_face_normals(bm, faces=bm.faces)
+        bm.to_mesh(mesh)
+        bm.free()
+        mesh.update()
+
+
+# A type 1 (subfile reference) line: colour, position and matrix, then the filename
+_SUBFILE_LINE = re.compile(rb'^[ \t]*1(?:[ \t]+\S+){13}[ \t]+(.+?)\s*$', re.M)
+
+
+def _part_files(input_file, ldraw_path):
+    """Yield (path, contents) for a part file and every subfile it pulls in, once each.
+
+    Subfiles are resolved the way ImportLDraw looks them up: next to the part
+    first, then in the library folders. References that resolve nowhere are
+    skipped, as ImportLDraw skips them.
+    """
+    search_dirs = [os.path.dirname(os.path.abspath(input_file))]
+    search_dirs += [os.path.join(ldraw_path, d) for d in LIBRARY_DIRS]
+
+    pending = [os.path.abspath(input_file)]
+    seen = set()
+    while pending:
+        path = pending.pop()
+        if path in seen:
+            continue
+        seen.add(path)
+        with open(path, "rb") as f:
+            data = f.read()
+        yield path, data
+
+        for ref in _SUBFILE_LINE.findall(data):
+            name = ref.decode("utf-8", "replace").replace("\\", os.sep)
+            for d in search_dirs:
+                candidates = (os.path.join(d, name), os.path.join(d, name.lower()))
+                found = next((c for c in candidates if os.path.isfile(c)), None)
+                if found:
+                    pending.append(found)
+                    break
+
+
+def part_cache_key(input_file, ldraw_path):
+    """Return the cache key for a part's imported geometry.
+
+    Keyed on the contents of the .dat and of every subpart and primitive it
+    references, plus the import settings that shape the mesh, so editing the
+    part or updating the library in place never hits a stale entry.
+    """
+    digest = hashlib.sha1(b"std|smooth|" + ldraw_path.encode())
+    for path, data in _part_files(input_file, ldraw_path):
+        digest.update(b"|%d|" % len(data) + data)
+    return digest.hexdigest()
+
+
+def load_cached_part(cache_path, scene):
+    """Append a previously joined part mesh from the cache into the scene."""
+    with bpy.data.libraries.load(cache_path, link=False) as (src, dst):
+        dst.objects = src.objects
+    for obj in dst.objects:
+        obj.use_fake_user = False
+        scene.collection.objects.link(obj)
+        if obj.type == 'MESH':
+            bpy.context.view_layer.objects.active = obj
+    # Evaluate once so bound_box is populated for camera framing
+    bpy.context.view_layer.update()
+
+
+def save_cached_part(cache_path, obj):
+    """Write the joined part mesh (and its materials) to the cache."""
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    bpy.data.libraries.write(cache_path, {obj}, fake_user=True)
+    print(f"Cached joined mesh to: {cache_path}")
+
+
+def _transform_points(matrix, points):
+    """Apply a 4x4 matrix to an (N, 3) float32 array of points.
+
+    Mirrors mathutils' ``Matrix @ Vector``: float32 products summed in double,
+    then rounded back to float32. A plain float32 matmul rounds differently,
+    which nudges the camera framing and every coordinate in the golden SVGs.
+    """
+    m = np.asarray(matrix, dtype=np.float32)
+    prod = (m[None, :3, :3] * points[:, None, :]).astype(np.float64)
+    out = prod[..., 0] + prod[..., 1] + prod[..., 2] + m[:3, 3].astype(np.float64)
+    return out.astype(np.float32)
+
+
+def camera_cache_path(cache_key, scene, padding, camera_lat, camera_lon):
+    """Return the JSON cache path for a part's camera framing at the given view."""
+    view = f"{cache_key}|{camera_lat}|{camera_lon}|{scene.render.resolution_x}|{scene.render.resolution_y}|{padding}"
+    return os.path.join(CACHE_DIR, "cam", hashlib.sha1(view.encode()).hexdigest() + ".json")
+
+
+def load_camera_framing(cache_path):
+    """Return the camera framing cached at cache_path, or None if there's no usable entry."""
+    try:
+        with open(cache_path) as f:
+            framing = json.load(f)
+        location, center = tuple(map(float, framing["location"])), tuple(map(float, framing["center"]))
+        if len(location) != 3 or len(center) != 3:
+            raise ValueError("location and center must be 3D")
+        return {
+            "location": location,
+            "center": center,
+            "ortho_scale": float(framing["ortho_scale"]),
+            "shift_x": float(framing["shift_x"]),
+            "shift_y": float(framing["shift_y"]),
+        }
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"Warning: ignoring unreadable camera cache {cache_path}: {e!r}")
+        return None
+
+
+def save_camera_framing(cache_path, framing):
+    """Write camera framing to the cache, warning instead of failing the render."""
+    # Write-then-rename so concurrent renders never read a partial file
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(tmp_path, "w") as f:
+            json.dump(framing, f)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Warning: could not cache camera framing: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _track_to(scene, cam_obj, target):
+    """Point the camera at a world-space target using a track constraint."""
+    track = cam_obj.constraints.new(type='TRACK_TO')
+    # Create an empty at the target to track
+    empty = bpy.data.objects.new("CamTarget", None)
+    empty.location = target
+    scene.collection.objects.link(empty)
+    track.target = empty
+    track.track_axis = 'TRACK_NEGATIVE_Z'
+    track.up_axis = 'UP_Y'
+
+
+def setup_camera(scene, padding=0.03, camera_lat=30.0, camera_lon=45.0, cache_key=None):
+    """Create an orthographic camera at a given angle, framed to fit all objects.
+
+    With a cache_key, the framing is saved after the first computation and
+    reused on later renders of the same part and view.
+    """
     cam_data = bpy.data.cameras.new("IsoCam")
     cam_data.type = 'ORTHO'
     cam_data.clip_start = 0.0001  # Tiny clip_start for small LDraw parts
@@ -110,29 +407,35 @@ def setup_camera(scene, padding=0.03, camera_lat=30.0, camera_lon=45.0):
     scene.collection.objects.link(cam_obj)
     scene.camera = cam_obj
 
+    cache_path = camera_cache_path(cache_key, scene, padding, camera_lat, camera_lon) if cache_key else None
+    framing = load_camera_framing(cache_path) if cache_path else None
+    if framing:
+        cam_obj.location = framing["location"]
+        _track_to(scene, cam_obj, mathutils.Vector(framing["center"]))
+        cam_data.ortho_scale = framing["ortho_scale"]
+        cam_data.shift_x = framing["shift_x"]
+        cam_data.shift_y = framing["shift_y"]
+        print(f"Camera framing loaded from cache: {cache_path}")
+        return
+
     lat = radians(camera_lat)
     lon = radians(camera_lon)
 
-    # Gather bounding box of all mesh objects
-    all_corners = []
-    for obj in scene.objects:
-        if obj.type == 'MESH':
-            for corner in obj.bound_box:
-                all_corners.append(obj.matrix_world @ mathutils.Vector(corner))
+    # Gather bounding box corners of all mesh objects in world space
+    corners = [
+        _transform_points(obj.matrix_world, np.array(obj.bound_box, dtype=np.float32))
+        for obj in scene.objects if obj.type == 'MESH'
+    ]
 
-    if not all_corners:
+    if not corners:
         print("Warning: no mesh objects found for camera framing")
         return
 
-    xs = [c.x for c in all_corners]
-    ys = [c.y for c in all_corners]
-    zs = [c.z for c in all_corners]
-    center = mathutils.Vector((
-        (min(xs) + max(xs)) / 2,
-        (min(ys) + max(ys)) / 2,
-        (min(zs) + max(zs)) / 2,
-    ))
-    size = max(max(xs) - min(xs), max(ys) - min(ys), max(zs) - min(zs))
+    corners = np.concatenate(corners)
+    lo = corners.min(axis=0).astype(np.float64)
+    hi = corners.max(axis=0).astype(np.float64)
+    center = mathutils.Vector((lo + hi) / 2)
+    size = float((hi - lo).max())
 
     # Position camera along isometric direction
     import math
@@ -144,30 +447,17 @@ def setup_camera(scene, padding=0.03, camera_lat=30.0, camera_lon=45.0):
     cam_obj.location = center + direction * distance
 
     # Point camera at center using track constraint
-    track = cam_obj.constraints.new(type='TRACK_TO')
-    # Create an empty at the center to track
-    empty = bpy.data.objects.new("CamTarget", None)
-    empty.location = center
-    scene.collection.objects.link(empty)
-    track.target = empty
-    track.track_axis = 'TRACK_NEGATIVE_Z'
-    track.up_axis = 'UP_Y'
+    _track_to(scene, cam_obj, center)
 
     # Update to apply constraint
     bpy.context.view_layer.update()
 
     # Now compute ortho_scale by projecting corners into camera view space
-    cam_matrix_inv = cam_obj.matrix_world.inverted()
-    min_vx = float('inf')
-    max_vx = float('-inf')
-    min_vy = float('inf')
-    max_vy = float('-inf')
-    for corner in all_corners:
-        v = cam_matrix_inv @ corner
-        min_vx = min(min_vx, v.x)
-        max_vx = max(max_vx, v.x)
-        min_vy = min(min_vy, v.y)
-        max_vy = max(max_vy, v.y)
+    view = _transform_points(cam_obj.matrix_world.inverted(), corners)
+    min_v = view.min(axis=0).astype(np.float64)
+    max_v = view.max(axis=0).astype(np.float64)
+    min_vx, min_vy = min_v[0], min_v[1]
+    max_vx, max_vy = max_v[0], max_v[1]
 
     ext_x = max_vx - min_vx
     ext_y = max_vy - min_vy
@@ -184,6 +474,21 @@ def setup_camera(scene, padding=0.03, camera_lat=30.0, camera_lon=45.0):
     cam_data.shift_x = -center_vx / (scale * aspect)
     cam_data.shift_y = -center_vy / scale
 
+    if cache_path:
+        # Stored as set on the camera, so a cache hit reproduces it exactly
+        framing = {
+            "location": list(cam_obj.location),
+            "center": list(center),
+            "ortho_scale": cam_data.ortho_scale,
+            "shift_x": cam_data.shift_x,
+            "shift_y": cam_data.shift_y,
+        }
+        save_camera_framing(cache_path, framing)
+
+
+# Settings the previous render's Freestyle view map was built with
+_view_map = {"settings": None}
+
 
 def setup_freestyle(scene, thickness, crease_angle=135.0, edge_types="silhouette,crease,border", fill_opacity=1.0):
     """Configure Freestyle for clean line drawing output."""
@@ -194,6 +499,20 @@ def setup_freestyle(scene, thickness, crease_angle=135.0, edge_types="silhouette
     fs_settings.mode = 'EDITOR'
     fs_settings.crease_angle = radians(crease_angle)
 
+    # Both linesets already share one view map per render. Across renders in a
+    # server, Freestyle can also keep it when the geometry and camera hash the
+    # same (e.g. one part re-rendered with new colors or thickness). The view
+    # map also depends on the crease angle, and it stores points in viewport
+    # pixels, which an ortho camera's hash doesn't capture (512x512 projects
+    # like 1024x1024). So only allow reuse when those are unchanged too.
+    view_map_settings = (crease_angle, scene.render.resolution_x, scene.render.resolution_y,
+                         scene.render.resolution_percentage)
+    fs_settings.use_view_map_cache = view_map_settings == _view_map["settings"]
+    _view_map["settings"] = view_map_settings
+    # Keep strokes in their own pass rather than compositing them over the
+    # discarded raster image
+    fs_settings.as_render_pass = True
+
     # Clear existing linesets
     while len(fs_settings.linesets) > 0:
         fs_settings.linesets.remove(fs_settings.linesets[0])
@@ -262,32 +581,92 @@ def setup_svg_export(scene, lineset):
     ls.use_export_fills = True
 
 
+SVG_BACKGROUND = b'<rect width="100%" height="100%" fill="white" />'
+# The document the Freestyle SVG exporter starts from, before any linesets are added
+EMPTY_SVG = ('<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n'
+             '<svg xmlns="http://www.w3.org/2000/svg" version="1.1" width="{:d}" height="{:d}">\n</svg>')
+SVG_DECLARATION = b"<?xml version='1.0' encoding='utf-8'?>\n"
+
+# Any start, end, or self-closing tag; groups are (closing "/", attributes, self-closing "/")
+_SVG_TAG = re.compile(rb'<(/?)[A-Za-z][^\s/>]*([^>]*?)(/?)>')
+_SVG_ID = re.compile(rb'\sid="([^"]*)"')
+_SVG_ROOT_TAG = re.compile(rb'<svg\b[^>]*>')
+
+# Blender's hardcoded colors, replaced with the requested ones in postprocess_svg
+_PAT_WHITE_FILL = re.compile(rb'fill="rgb\(255,\s*255,\s*255\)"')
+_PAT_BLACK_STROKE = re.compile(rb'stroke="rgb\(0,\s*0,\s*0\)"')
+_PAT_FILL_OPACITY = re.compile(rb'fill-opacity="1\.0"')
+
+
 def postprocess_svg(svg_path, fill_color, fill_opacity=1.0, stroke_color="currentColor"):
-    """Replace Blender's hardcoded colors with configurable values."""
-    with open(svg_path, "r") as f:
+    """Recolor, reorder and add a white background to the exported SVG.
+
+    Everything is done as byte-level substitutions on a single read and write
+    of the file, rather than decoding, parsing and reserializing the document.
+    """
+    with open(svg_path, "rb") as f:
         content = f.read()
 
-    # Replace Blender's white fill (from white material) with the requested fill color
-    content = re.sub(r'fill="rgb\(255,\s*255,\s*255\)"', f'fill="{fill_color}"', content)
+    # Replace Blender's white fill (from white material) with the requested fill color.
+    # Replacements are callables so colors are inserted verbatim, never parsed
+    # for backreferences.
+    fill = f'fill="{fill_color}"'.encode()
+    content = _PAT_WHITE_FILL.sub(lambda m: fill, content)
 
     # Replace black strokes with the requested stroke color
-    content = re.sub(r'stroke="rgb\(0,\s*0,\s*0\)"', f'stroke="{stroke_color}"', content)
+    stroke = f'stroke="{stroke_color}"'.encode()
+    content = _PAT_BLACK_STROKE.sub(lambda m: stroke, content)
 
     # Apply fill opacity for transparent/translucent parts
     if fill_opacity < 1.0:
-        content = re.sub(r'fill-opacity="1\.0"', f'fill-opacity="{fill_opacity:.4f}"', content)
+        opacity = f'fill-opacity="{fill_opacity:.4f}"'.encode()
+        content = _PAT_FILL_OPACITY.sub(lambda m: opacity, content)
 
-    with open(svg_path, "w") as f:
-        f.write(content)
+    # Keep only the root element under a fixed declaration, as the previous
+    # ElementTree round-trip did, so output stays byte-identical to it.
+    content = SVG_DECLARATION + content[content.index(b"<svg"):content.rindex(b">") + 1]
 
     # For translucent/transparent parts, reorder SVG groups so HiddenEdges appears
     # before Edges. SVG renders later elements on top, so hidden edge strokes must
     # come first to appear behind the semi-transparent fills.
     if fill_opacity < 1.0:
-        _reorder_svg_hidden_edges(svg_path)
+        content = _reorder_svg_hidden_edges(content)
+
+    # Add white background for dark mode compatibility
+    content = _add_svg_background(content)
+
+    # Write-then-rename so the SVG is never seen half-written
+    tmp_path = f"{svg_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(content)
+    os.replace(tmp_path, svg_path)
+    print(f"Added white background to: {svg_path}")
+
 
+def _svg_root_children(content):
+    """Yield (start, end, id) spans for each direct child element of the SVG root.
 
-def _reorder_svg_hidden_edges(svg_path):
+    Each span covers the element and its trailing whitespace, so moving a span
+    moves the element together with the text that follows it.
+    """
+    depth = 0
+    for m in _SVG_TAG.finditer(content):
+        closing, attrs, self_closing = m.groups()
+        if closing:
+            depth -= 1
+        elif depth == 1:
+            child_start = m.start()
+            child_id = _SVG_ID.search(attrs)
+            child_id = child_id.group(1) if child_id else b""
+        if not closing and not self_closing:
+            depth += 1
+        if depth == 1 and (closing or self_closing):
+            end = m.end()
+            next_tag = content.find(b"<", end)
+            yield child_start, end if next_tag < 0 else next_tag, child_id
+
+
+def _reorder_svg_hidden_edges(content):
     """Move HiddenEdges lineset group before Edges group for correct z-ordering.
 
     Blender outputs HiddenEdges after Edges, which causes hidden edge strokes to
@@ -296,105 +675,109 @@ def _reorder_svg_hidden_edges(svg_path):
       2. Edges fills (semi-transparent)
       3. Edges strokes (on top)
     """
-    SVG_NS = "http://www.w3.org/2000/svg"
-    ET.register_namespace("", SVG_NS)
-    ET.register_namespace("inkscape", "http://www.inkscape.org/namespaces/inkscape")
-
-    tree = ET.parse(svg_path)
-    root = tree.getroot()
-
     # Find HiddenEdges and Edges lineset groups by id attribute.
     # Check HiddenEdges first since "Edges" is a substring of "HiddenEdges".
-    hidden_group = None
-    edges_group = None
-    for child in root:
-        child_id = child.get("id", "")
-        if "HiddenEdges" in child_id:
-            hidden_group = child
-        elif "Edges" in child_id:
-            edges_group = child
-
-    if hidden_group is None or edges_group is None:
+    hidden_span = None
+    edges_span = None
+    for start, end, child_id in _svg_root_children(content):
+        if b"HiddenEdges" in child_id:
+            hidden_span = (start, end)
+        elif b"Edges" in child_id:
+            edges_span = (start, end)
+
+    if hidden_span is None or edges_span is None:
         print("SVG group reordering skipped: HiddenEdges or Edges group not found")
-        return
+        return content
 
-    children = list(root)
-    hidden_idx = children.index(hidden_group)
-    edges_idx = children.index(edges_group)
-
-    if hidden_idx <= edges_idx:
+    if hidden_span[0] <= edges_span[0]:
         print("SVG group reordering skipped: HiddenEdges already before Edges")
-        return
-
-    # Remove HiddenEdges and reinsert before Edges
-    root.remove(hidden_group)
-    children = list(root)
-    edges_idx = children.index(edges_group)
-    root.insert(edges_idx, hidden_group)
-
-    tree.write(svg_path, xml_declaration=True, encoding="unicode")
+        return content
+
+    # Cut HiddenEdges out and splice it in front of Edges
+    (hidden_start, hidden_end), edges_start = hidden_span, edges_span[0]
+    content = (content[:edges_start]
+               + content[hidden_start:hidden_end]
+               + content[edges_start:hidden_start]
+               + content[hidden_end:])
     print("Reordered SVG groups: HiddenEdges moved before Edges for correct z-ordering")
+    return content
 
 
-def add_svg_background(svg_path):
+def _add_svg_background(content):
     """Insert a white background rect as the first child of the SVG root."""
-    SVG_NS = "http://www.w3.org/2000/svg"
-    ET.register_namespace("", SVG_NS)
-    tree = ET.parse(svg_path)
-    root = tree.getroot()
-    bg = ET.Element("rect")
-    bg.set("width", "100%")
-    bg.set("height", "100%")
-    bg.set("fill", "white")
-    root.insert(0, bg)
-    tree.write(svg_path, xml_declaration=True, encoding="unicode")
-    print(f"Added white background to: {svg_path}")
+    root_tag = _SVG_ROOT_TAG.search(content)
+    if root_tag.group(0).endswith(b"/>"):
+        # Empty root: expand <svg ... /> so the rect has somewhere to go
+        opening = root_tag.group(0)[:-2].rstrip() + b">"
+        return content[:root_tag.start()] + opening + SVG_BACKGROUND + b"</svg>"
+    first_child = content.index(b"<", root_tag.end())
+    return content[:first_child] + SVG_BACKGROUND + content[first_child:]
 
 
-def main():
-    args = parse_args()
+def write_empty_svg(args):
+    """Write the SVG Freestyle produces for a part with no faces, without rendering."""
+    output_svg = os.path.abspath(args["output_svg"])
+    os.makedirs(os.path.dirname(output_svg), exist_ok=True)
+    with open(output_svg, "w") as f:
+        f.write(EMPTY_SVG.format(args["resolution_x"], args["resolution_y"]))
+    postprocess_svg(output_svg, args["fill_color"], args["fill_opacity"], args["stroke_color"])
+    print(f"SVG written to: {output_svg}")
 
-    # Enable addons
-    addon_utils.enable("ImportLDraw")
-    addon_utils.enable("render_freestyle_svg", default_set=True, persistent=True)
 
+def render_one(args):
+    """Render a single part to SVG; raises RuntimeError if no SVG is produced."""
     scene = bpy.context.scene
 
     # Clear default scene
     clear_scene()
 
-    # Import LDraw part
-    print(f"Importing {args['input_file']}...")
-    import_ldraw_part(args["input_file"], args["ldraw_path"])
-
-    # Make any collection instances into real geometry, join all meshes,
-    # and recalculate normals — required for Freestyle to detect edges
-    # on all ImportLDraw-imported parts.
-    bpy.ops.object.select_all(action='SELECT')
-    bpy.ops.object.duplicates_make_real()
-    bpy.ops.object.select_all(action='DESELECT')
-    meshes = [o for o in scene.objects if o.type == 'MESH']
-    for o in meshes:
-        o.select_set(True)
-    if meshes:
-        bpy.context.view_layer.objects.active = meshes[0]
-        if len(meshes) > 1:
-            bpy.ops.object.join()
-        bpy.ops.object.mode_set(mode='EDIT')
-        bpy.ops.mesh.select_all(action='SELECT')
-        bpy.ops.mesh.normals_make_consistent(inside=False)
-        bpy.ops.object.mode_set(mode='OBJECT')
+    # Import LDraw part, or reuse the joined mesh from an earlier render. The
+    # cache is best-effort: any problem with it falls back to a fresh import.
+    part_key = cache_path = None
+    if CACHE_DIR:
+        try:
+            part_key = part_cache_key(args["input_file"], args["ldraw_path"])
+            cache_path = os.path.join(CACHE_DIR, f"{part_key}.blend")
+        except OSError as e:
+            print(f"Warning: part cache skipped: {e}")
+
+    loaded = False
+    if cache_path and os.path.exists(cache_path):
+        print(f"Loading {args['input_file']} from cache {cache_path}...")
+        try:
+            load_cached_part(cache_path, scene)
+            loaded = True
+        except (OSError, RuntimeError) as e:
+            print(f"Warning: could not load cached part, importing instead: {e}")
+            clear_scene()
+
+    if not loaded:
+        print(f"Importing {args['input_file']}...")
+        import_ldraw_part(args["input_file"], args["ldraw_path"])
+        join_part_meshes(scene)
+        obj = bpy.context.active_object
+        if cache_path and obj and obj.type == 'MESH':
+            try:
+                save_cached_part(cache_path, obj)
+            except (OSError, RuntimeError) as e:
+                print(f"Warning: could not cache part: {e}")
 
     obj = bpy.context.active_object
     if obj and obj.type == 'MESH':
         print(f"Mesh: {len(obj.data.vertices)} verts, {len(obj.data.polygons)} faces")
 
-    # Set all materials to white for line-drawing look
-    for obj in scene.objects:
-        if obj.type == 'MESH':
-            for slot in obj.material_slots:
-                if slot.material:
-                    slot.material.diffuse_color = (1.0, 1.0, 1.0, 1.0)
+    # Freestyle only draws and fills faces, so a part without any (e.g. one
+    # made only of LDraw lines) can skip the render altogether
+    if not any(len(o.data.polygons) for o in scene.objects if o.type == 'MESH'):
+        print("No faces to draw, skipping render")
+        write_empty_svg(args)
+        return
+
+    # Freestyle's SVG fills read each face's own material, so whiten them all;
+    # linked parts share materials, so each is visited only once. Surfaces are
+    # never shaded (see use_solid below), so no override material is needed.
+    for mat in bpy.data.materials:
+        mat.diffuse_color = (1.0, 1.0, 1.0, 1.0)
 
     # Configure render settings
     # Use Cycles (CPU) — EEVEE requires OpenGL which isn't available in WSL2 headless
@@ -404,12 +787,25 @@ def main():
     scene.render.resolution_x = args["resolution_x"]
     scene.render.resolution_y = args["resolution_y"]
     scene.render.film_transparent = True
+    # Parallel batch renders pin each Blender to one thread to avoid oversubscription
+    scene.render.threads_mode = 'FIXED' if args["threads"] else 'AUTO'
+    if args["threads"]:
+        scene.render.threads = args["threads"]
+
+    # Only Freestyle's SVG side-output is kept, so skip every raster stage that
+    # doesn't feed it: no surface shading (Freestyle builds its own view map
+    # from the meshes), no denoising, compositing or sequencer
+    bpy.context.view_layer.use_solid = False
+    scene.cycles.use_denoising = False
+    scene.render.use_compositing = False
+    scene.render.use_sequencer = False
 
     # Setup camera
     setup_camera(scene,
                  padding=args["padding"],
                  camera_lat=args["camera_lat"],
-                 camera_lon=args["camera_lon"])
+                 camera_lon=args["camera_lon"],
+                 cache_key=part_key)
 
     # Setup Freestyle
     setup_freestyle(scene, args["thickness"],
@@ -428,14 +824,24 @@ def main():
     output_base = os.path.splitext(os.path.basename(output_svg))[0]
     os.makedirs(output_dir, exist_ok=True)
 
+    # The SVG exporter appends the frame number as four digits. When the output
+    # name already ends in four digits, render that frame so the exporter writes
+    # straight to output_svg; otherwise render frame 1 and rename afterwards.
+    frame_digits = output_base[-4:]
+    if len(frame_digits) == 4 and frame_digits.isascii() and frame_digits.isdigit():
+        scene.frame_current = int(frame_digits)
+        output_base = output_base[:-4]
+    else:
+        scene.frame_current = 1
+
     scene.render.filepath = os.path.join(output_dir, output_base)
 
     # Render (triggers SVG export as side-effect)
     print("Rendering...")
     bpy.ops.render.render(write_still=False)
 
-    # SVG exporter writes to <filepath>0001.svg
-    expected_svg = os.path.join(output_dir, f"{output_base}0001.svg")
+    # SVG exporter writes to <filepath><frame>.svg
+    expected_svg = os.path.join(output_dir, f"{output_base}{scene.frame_current:04d}.svg")
     if os.path.exists(expected_svg):
         if expected_svg != output_svg:
             os.rename(expected_svg, output_svg)
@@ -446,10 +852,44 @@ def main():
         # List files in output dir for debugging
         for f in os.listdir(output_dir):
             print(f"  {f}")
-        sys.exit(1)
+        raise RuntimeError(f"expected SVG not found at {expected_svg}")
+
+
+def serve():
+    """Render jobs read as JSON lines from stdin until EOF, replying on stdout."""
+    # Blender and this script print progress to stdout. Keep the reply stream
+    # clean by answering on a private copy of stdout and pointing fd 1 at stderr.
+    sys.stdout.flush()
+    replies = os.fdopen(os.dup(1), "w")
+    os.dup2(2, 1)
+
+    enable_addons()
+    keep_ldraw_parse_caches()
 
-    # Post-process SVG: add white background for dark mode compatibility
-    add_svg_background(output_svg)
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            render_one(job_args(json.loads(line)))
+            reply = {"ok": True}
+        except Exception as e:
+            reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        replies.write(json.dumps(reply) + "\n")
+        replies.flush()
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    if argv[:1] == ["--server"]:
+        serve()
+        return
+
+    args = parse_args()
+    enable_addons()
+    try:
+        render_one(args)
+    except RuntimeError:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,96 @@
+"""
+Drive a persistent Blender process running render_part.py in server mode.
+
+Starting Blender and enabling its addons costs about a second per part, so
+batch jobs keep one process alive and send it one job at a time.
+
+Usage:
+    from render_server import RenderServer
+
+    with RenderServer() as server:
+        server.render({"input_file": "3001.dat", "output_svg": "3001.svg"})
+
+Job keys match the argument names in render_part.py; omitted keys take the
+same defaults as the command line.
+"""
+
+import json
+import os
+import subprocess
+import threading
+
+RENDER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "render_part.py")
+
+
+class RenderServer:
+    """A Blender process that renders one part per JSON line sent to it."""
+
+    def __init__(self, blender="blender", script=RENDER_SCRIPT):
+        self.process = subprocess.Popen(
+            [blender, "--background", "--python", script, "--", "--server"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+
+    def render(self, job, timeout=None):
+        """Render one job and return its reply; raises RuntimeError on failure.
+
+        If the job takes longer than timeout seconds, Blender is killed and the
+        server can't be used again.
+        """
+        expired = threading.Event()
+
+        def expire():
+            expired.set()
+            self.process.kill()
+
+        timer = threading.Timer(timeout, expire) if timeout else None
+        if timer:
+            timer.start()
+        reply = None
+        try:
+            self.process.stdin.write(json.dumps(job) + "\n")
+            self.process.stdin.flush()
+
+            # Blender prints its startup banner to stdout before render_part.py
+            # takes the stream over, so skip anything that isn't a reply
+            for line in self.process.stdout:
+                if line.startswith("{"):
+                    reply = json.loads(line)
+                    break
+        except OSError:
+            if not expired.is_set():
+                raise
+        finally:
+            if timer:
+                timer.cancel()
+                # cancel() can't stop an expire() that is already running, so
+                # wait for it before deciding whether this job timed out
+                timer.join()
+
+        # Even with a reply in hand, a timer that fired has killed Blender, so
+        # report the timeout rather than leaving a dead server looking healthy
+        if expired.is_set():
+            self.process.wait()
+            raise RuntimeError(f"render timed out after {timeout} seconds")
+        if reply is None:
+            raise RuntimeError(f"Blender exited with status {self.process.wait()}")
+        if not reply["ok"]:
+            raise RuntimeError(reply["error"])
+        return reply
+
+    def close(self):
+        """Stop the server once its current job (if any) finishes."""
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            # Blender already exited with a job still unread in the pipe
+            pass
+        self.process.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
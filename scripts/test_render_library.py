@@ -0,0 +1,119 @@
+"""
+Tests for render_library.py and render_server.py, using a stand-in for Blender.
+
+Usage:
+    python3 -m unittest discover -s scripts
+
+The fake Blender speaks render_part.py's server protocol. It records each job
+and its own pid in the output file, and misbehaves for parts named hang*,
+crash* and bad*.
+"""
+
+import json
+import os
+import stat
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from render_library import render_library
+
+FAKE_BLENDER = f"""#!{sys.executable}
+import json, os, sys, time
+print("Blender (fake)", flush=True)
+for line in sys.stdin:
+    job = json.loads(line)
+    name = os.path.basename(job["input_file"])
+    if name.startswith("hang"):
+        time.sleep(60)
+    if name.startswith("crash"):
+        sys.exit(3)
+    if name.startswith("bad"):
+        reply = {{"ok": False, "error": "ValueError: bad part"}}
+    else:
+        with open(job["output_svg"], "w") as f:
+            json.dump(dict(job, pid=os.getpid()), f)
+        reply = {{"ok": True}}
+    print(json.dumps(reply), flush=True)
+"""
+
+
+class RenderLibraryTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.output_dir = os.path.join(tmp.name, "out")
+        self.blender = os.path.join(tmp.name, "blender")
+        with open(self.blender, "w") as f:
+            f.write(FAKE_BLENDER)
+        os.chmod(self.blender, os.stat(self.blender).st_mode | stat.S_IEXEC)
+
+    def rendered(self, stem):
+        with open(os.path.join(self.output_dir, f"{stem}.svg")) as f:
+            return json.load(f)
+
+    def test_renders_each_part_with_options(self):
+        failures = render_library(["lib/3001.dat", "lib/3002.dat"], self.output_dir, workers=2,
+                                  blender=self.blender, options={"thickness": 3.0})
+        self.assertEqual(failures, [])
+        job = self.rendered("3001")
+        self.assertEqual((job["input_file"], job["thickness"], job["threads"]), ("lib/3001.dat", 3.0, 1))
+        self.assertEqual(self.rendered("3002")["output_svg"], os.path.join(self.output_dir, "3002.svg"))
+
+    def test_error_reply_keeps_server(self):
+        failures = render_library(["1.dat", "bad.dat", "2.dat"], self.output_dir, workers=1,
+                                  blender=self.blender)
+        self.assertEqual(failures, [("bad.dat", "ValueError: bad part")])
+        self.assertEqual(self.rendered("1")["pid"], self.rendered("2")["pid"])
+
+    def test_crashed_server_is_replaced(self):
+        failures = render_library(["1.dat", "crash.dat", "2.dat"], self.output_dir, workers=1,
+                                  blender=self.blender)
+        self.assertEqual(failures, [("crash.dat", "Blender exited with status 3")])
+        self.assertNotEqual(self.rendered("1")["pid"], self.rendered("2")["pid"])
+
+    def test_hung_server_is_killed_and_replaced(self):
+        failures = render_library(["hang.dat", "1.dat"], self.output_dir, workers=1,
+                                  blender=self.blender, timeout=0.5)
+        self.assertEqual(failures, [("hang.dat", "render timed out after 0.5 seconds")])
+        self.assertIn("pid", self.rendered("1"))
+
+    def test_timeout_racing_a_reply_replaces_server(self):
+        class RacingTimer:
+            """A timer whose callback fires just as the reply arrives."""
+
+            def __init__(self, interval, function):
+                self.function = function
+
+            def start(self):
+                pass
+
+            def cancel(self):
+                self.function()
+
+            def join(self):
+                pass
+
+        with mock.patch("render_server.threading.Timer", RacingTimer):
+            failures = render_library(["1.dat", "2.dat"], self.output_dir, workers=1,
+                                      blender=self.blender, timeout=30)
+        # Each job was killed after replying; both are timeouts, neither a broken pipe
+        self.assertEqual(failures, [("1.dat", "render timed out after 30 seconds"),
+                                    ("2.dat", "render timed out after 30 seconds")])
+
+    def test_parts_with_the_same_name_are_rejected(self):
+        with self.assertRaisesRegex(ValueError, "parts/3001.dat, unofficial/parts/3001.dat"):
+            render_library(["parts/3001.dat", "parts/3002.dat", "unofficial/parts/3001.dat"],
+                           self.output_dir, blender=self.blender)
+        self.assertFalse(os.path.exists(self.output_dir))
+
+    def test_missing_blender_fails_every_part(self):
+        missing = os.path.join(os.path.dirname(self.blender), "no-blender")
+        failures = render_library(["1.dat", "2.dat"], self.output_dir, workers=1, blender=missing)
+        self.assertEqual([part for part, _ in failures], ["1.dat", "2.dat"])
+
+
+if __name__ == "__main__":
+    unittest.main()
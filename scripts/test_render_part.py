@@ -0,0 +1,284 @@
+"""
+Tests for the parts of render_part.py that run without Blender: SVG
+post-processing, job arguments, and the camera and parse caches.
+
+Usage:
+    python3 -m unittest discover -s scripts
+
+Blender's modules are stubbed when they can't be imported, so only the
+pure-Python helpers are exercised here; full renders are covered by the
+golden tests in docker/server_test.go.
+"""
+
+import os
+import sys
+import tempfile
+import types
+import unittest
+
+for _name in ("bpy", "bmesh", "addon_utils", "mathutils"):
+    try:
+        __import__(_name)
+    except ImportError:
+        sys.modules[_name] = types.ModuleType(_name)
+
+import render_part  # noqa: E402
+
+# Trimmed-down Freestyle SVG export of a translucent part: Edges then HiddenEdges.
+# The exporter writes it with ElementTree, so namespaces are declared on the root.
+BLENDER_SVG = b"""<?xml version='1.0' encoding='ascii'?>
+<svg xmlns="http://www.w3.org/2000/svg" xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape" version="1.1" width="8" height="8">
+    <g id="ViewLayer_Edges" inkscape:groupmode="lineset" inkscape:label="ViewLayer_Edges">
+        <g inkscape:groupmode="layer" inkscape:label="fills" id="fills">
+            <path fill-rule="evenodd" fill="rgb(255, 255, 255)" fill-opacity="1.0" stroke="none" d="M 1,1 2,2 z" />
+        </g>
+        <g inkscape:groupmode="layer" id="strokes" inkscape:label="strokes">
+            <path fill="none" stroke-width="2.0" stroke="rgb(0, 0, 0)" d=" M 1,1 2,2 " />
+        </g>
+    </g>
+    <g id="ViewLayer_HiddenEdges" inkscape:groupmode="lineset" inkscape:label="ViewLayer_HiddenEdges">
+        <g inkscape:groupmode="layer" id="strokes" inkscape:label="strokes">
+            <path fill="none" stroke-width="2.0" stroke="rgb(0, 0, 0)" d=" M 3,3 4,4 " />
+        </g>
+    </g>
+    </svg>"""
+
+# What the ElementTree round-trip this replaced produced for BLENDER_SVG
+# with fill_color="#4a90d9" and fill_opacity=0.5
+EXPECTED_TRANSLUCENT_SVG = b"""<?xml version='1.0' encoding='utf-8'?>
+<svg xmlns="http://www.w3.org/2000/svg" xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape" version="1.1" width="8" height="8">
+    <rect width="100%" height="100%" fill="white" /><g id="ViewLayer_HiddenEdges" inkscape:groupmode="lineset" inkscape:label="ViewLayer_HiddenEdges">
+        <g inkscape:groupmode="layer" id="strokes" inkscape:label="strokes">
+            <path fill="none" stroke-width="2.0" stroke="currentColor" d=" M 3,3 4,4 " />
+        </g>
+    </g>
+    <g id="ViewLayer_Edges" inkscape:groupmode="lineset" inkscape:label="ViewLayer_Edges">
+        <g inkscape:groupmode="layer" inkscape:label="fills" id="fills">
+            <path fill-rule="evenodd" fill="#4a90d9" fill-opacity="0.5000" stroke="none" d="M 1,1 2,2 z" />
+        </g>
+        <g inkscape:groupmode="layer" id="strokes" inkscape:label="strokes">
+            <path fill="none" stroke-width="2.0" stroke="currentColor" d=" M 1,1 2,2 " />
+        </g>
+    </g>
+    </svg>"""
+
+
+class JobArgsTest(unittest.TestCase):
+
+    def test_omitted_keys_take_cli_defaults(self):
+        args = render_part.job_args({"input_file": "3001.dat", "output_svg": "3001.svg"})
+        defaults = {name: default for name, _, default in render_part.ARGUMENTS}
+        self.assertEqual(args, dict(defaults, input_file="3001.dat", output_svg="3001.svg"))
+
+    def test_values_are_converted_like_cli_arguments(self):
+        args = render_part.job_args({"input_file": "a.dat", "output_svg": "a.svg",
+                                     "thickness": "3", "resolution_x": 512.0, "threads": "1"})
+        self.assertEqual((args["thickness"], args["resolution_x"], args["threads"]), (3.0, 512, 1))
+        self.assertIsInstance(args["thickness"], float)
+
+    def test_missing_paths_are_rejected(self):
+        with self.assertRaisesRegex(ValueError, "input_file, output_svg"):
+            render_part.job_args({"thickness": 2.0})
+
+    def test_unknown_keys_are_ignored(self):
+        args = render_part.job_args({"input_file": "a.dat", "output_svg": "a.svg", "bogus": 1})
+        self.assertNotIn("bogus", args)
+
+
+class CameraFramingCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache_path = os.path.join(tmp.name, "cam", "part.json")
+        self.framing = {"location": (1.0, 2.0, 3.0), "center": (0.0, 0.0, 0.5),
+                        "ortho_scale": 4.0, "shift_x": 0.25, "shift_y": -0.125}
+
+    def write(self, text):
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        with open(self.cache_path, "w") as f:
+            f.write(text)
+
+    def test_round_trip(self):
+        render_part.save_camera_framing(self.cache_path, self.framing)
+        self.assertEqual(render_part.load_camera_framing(self.cache_path), self.framing)
+
+    def test_unusable_entries_are_misses(self):
+        self.assertIsNone(render_part.load_camera_framing(self.cache_path))
+        for text in ("{not json", "[]", '{"location": [1, 2, 3]}',
+                     '{"location": [1, 2], "center": [0, 0, 0], "ortho_scale": 1, "shift_x": 0, "shift_y": 0}'):
+            with self.subTest(text=text):
+                self.write(text)
+                self.assertIsNone(render_part.load_camera_framing(self.cache_path))
+
+    def test_unwritable_cache_only_warns(self):
+        # The cache directory can't be created where a file already exists
+        self.write("")
+        blocked = os.path.join(self.cache_path, "cam", "part.json")
+        render_part.save_camera_framing(blocked, self.framing)
+        self.assertIsNone(render_part.load_camera_framing(blocked))
+
+
+class ParseCacheTest(unittest.TestCase):
+    """Pruning of ImportLDraw's parsed-file caches between server-mode imports."""
+
+    class ParsedFile:
+        def __init__(self, path):
+            self.fullFilepath = path
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.library = os.path.join(tmp.name, "ldraw")
+        self.stud = self.touch(self.library, "p", "stud.dat")
+        self.subpart = self.touch(self.library, "parts", "s", "3001s01.dat")
+        self.library_part = self.touch(self.library, "parts", "3001.dat")
+        self.part = self.touch(tmp.name, "upload", "part.dat")
+        self.addCleanup(render_part._parse_caches.update, dict(render_part._parse_caches))
+        render_part._parse_caches.update(ldraw_path=self.library, stamps={})
+
+    def touch(self, *parts):
+        path = os.path.join(*parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write("0 file\n")
+        return path
+
+    def make_cache(self):
+        class CachedFiles:
+            __cache = {
+                "stud.dat": self.ParsedFile(self.stud),
+                "s\\3001s01.dat": self.ParsedFile(self.subpart),
+                self.library_part: self.ParsedFile(self.library_part),
+                self.part: self.ParsedFile(self.part),
+            }
+            __dirs = {os.path.dirname(self.stud): {"stud.dat"},
+                      os.path.dirname(self.library_part): {"3001.dat"},
+                      os.path.dirname(self.part): {"part.dat"}}
+        return CachedFiles
+
+    def test_keeps_only_shared_library_files(self):
+        cache = self.make_cache()
+        render_part._prune_parse_cache(cache)
+        self.assertEqual(list(cache._CachedFiles__cache), ["stud.dat", "s\\3001s01.dat"])
+        self.assertEqual(list(cache._CachedFiles__dirs),
+                         [os.path.dirname(self.stud), os.path.dirname(self.library_part)])
+
+    def test_top_level_library_parts_are_not_kept(self):
+        # Parts rendered from <library>/parts/ must not pile up across jobs
+        for _ in range(2):
+            cache = self.make_cache()
+            render_part._prune_parse_cache(cache)
+            self.assertNotIn(self.library_part, cache._CachedFiles__cache)
+        self.assertNotIn(self.library_part, render_part._parse_caches["stamps"])
+
+    def test_drops_library_files_changed_on_disk(self):
+        render_part._prune_parse_cache(self.make_cache())
+        with open(self.stud, "a") as f:
+            f.write("0 updated\n")
+        cache = self.make_cache()
+        render_part._prune_parse_cache(cache)
+        self.assertNotIn("stud.dat", cache._CachedFiles__cache)
+        # The re-parsed file is kept again from then on
+        cache = self.make_cache()
+        render_part._prune_parse_cache(cache)
+        self.assertIn("stud.dat", cache._CachedFiles__cache)
+
+
+class ReorderHiddenEdgesTest(unittest.TestCase):
+
+    def test_moves_hidden_edges_before_edges(self):
+        content = (b'<svg>\n  <g id="L_Edges"><path d="a" /></g>\n'
+                   b'  <g id="L_HiddenEdges"><path d="b" /></g>\n  <g id="other" />\n</svg>')
+        self.assertEqual(
+            render_part._reorder_svg_hidden_edges(content),
+            b'<svg>\n  <g id="L_HiddenEdges"><path d="b" /></g>\n'
+            b'  <g id="L_Edges"><path d="a" /></g>\n  <g id="other" />\n</svg>')
+
+    def test_hidden_edges_last_child_keeps_closing_whitespace(self):
+        # The last child's tail is the whitespace before </svg>; it stays at the end
+        content = b'<svg>\n  <g id="L_Edges"><path d="a" /></g>\n  <g id="L_HiddenEdges" />\n</svg>'
+        self.assertEqual(
+            render_part._reorder_svg_hidden_edges(content),
+            b'<svg>\n  <g id="L_HiddenEdges" />\n<g id="L_Edges"><path d="a" /></g>\n  </svg>')
+
+    def test_hidden_edges_already_first_is_unchanged(self):
+        content = b'<svg>\n  <g id="L_HiddenEdges" />\n  <g id="L_Edges" />\n</svg>'
+        self.assertEqual(render_part._reorder_svg_hidden_edges(content), content)
+
+    def test_missing_hidden_edges_is_unchanged(self):
+        content = b'<svg>\n  <g id="L_Edges"><path d="a" /></g>\n</svg>'
+        self.assertEqual(render_part._reorder_svg_hidden_edges(content), content)
+
+    def test_ignores_ids_of_nested_groups(self):
+        # Only direct children of the root count, not groups nested inside them
+        content = (b'<svg>\n  <g id="L_Edges"><g id="Nested_HiddenEdges"><path /></g></g>\n'
+                   b'  <rect />\n</svg>')
+        self.assertEqual(render_part._reorder_svg_hidden_edges(content), content)
+
+
+class SvgRootChildrenTest(unittest.TestCase):
+
+    def test_spans_cover_each_child_and_its_tail(self):
+        content = b'<svg a="1">\n <rect /> <g id="x"><g id="y"><path /></g></g>\n <g id="z"></g></svg>'
+        spans = [(content[start:end], child_id)
+                 for start, end, child_id in render_part._svg_root_children(content)]
+        self.assertEqual(spans, [
+            (b'<rect /> ', b""),
+            (b'<g id="x"><g id="y"><path /></g></g>\n ', b"x"),
+            (b'<g id="z"></g>', b"z"),
+        ])
+
+
+class AddSvgBackgroundTest(unittest.TestCase):
+
+    def test_inserts_before_first_child(self):
+        content = b'<svg width="8">\n    <g id="a" />\n</svg>'
+        self.assertEqual(
+            render_part._add_svg_background(content),
+            b'<svg width="8">\n    <rect width="100%" height="100%" fill="white" /><g id="a" />\n</svg>')
+
+    def test_expands_empty_root(self):
+        self.assertEqual(
+            render_part._add_svg_background(b'<svg width="8" height="8" />'),
+            b'<svg width="8" height="8"><rect width="100%" height="100%" fill="white" /></svg>')
+
+
+class PostprocessSvgTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.svg_path = os.path.join(self.tmp.name, "part.svg")
+
+    def postprocess(self, content, *args):
+        with open(self.svg_path, "wb") as f:
+            f.write(content)
+        render_part.postprocess_svg(self.svg_path, *args)
+        with open(self.svg_path, "rb") as f:
+            return f.read()
+
+    def test_translucent_matches_previous_output(self):
+        self.assertEqual(self.postprocess(BLENDER_SVG, "#4a90d9", 0.5), EXPECTED_TRANSLUCENT_SVG)
+
+    def test_opaque_keeps_order_and_opacity(self):
+        output = self.postprocess(BLENDER_SVG, "white", 1.0)
+        self.assertIn(b'fill="white" fill-opacity="1.0"', output)
+        self.assertLess(output.index(b'id="ViewLayer_Edges"'), output.index(b'id="ViewLayer_HiddenEdges"'))
+
+    def test_colors_are_inserted_verbatim(self):
+        output = self.postprocess(BLENDER_SVG, r"\1", 1.0, r"\g<0>")
+        self.assertIn(b'fill="\\1"', output)
+        self.assertIn(b'stroke="\\g<0>"', output)
+
+    def test_empty_document(self):
+        empty = render_part.EMPTY_SVG.format(8, 8).encode()
+        self.assertEqual(
+            self.postprocess(empty, "white", 1.0),
+            b"<?xml version='1.0' encoding='utf-8'?>\n"
+            b'<svg xmlns="http://www.w3.org/2000/svg" version="1.1" width="8" height="8">\n'
+            b'<rect width="100%" height="100%" fill="white" /></svg>')
+
+
+if __name__ == "__main__":
+    unittest.main()